@@ -1,35 +1,114 @@
 import os
-import pandas as pd
-import glob
-import simplejson as json
+import gzip
+import heapq
+import itertools
+import mmap
+from operator import attrgetter
+import xlsxwriter
+import msgspec
+import orjson
+import diskcache
 import concurrent.futures
-import requests
-import time
+import asyncio
+import httpx
+import importlib.util
+from aiolimiter import AsyncLimiter
 from datetime import datetime
 import traceback
 
 # Since I'm saving my outputs to a simple excel table, there's a limit to the number of rows I can have
 MAX_EXCEL_ROWS = 999999
-# Global variable to keep track of the number of ORCID API requests made
+# Header row of the output excel files
+COLUMNS = ['Display Name', 'ORCID', 'Concepts', 'H-Index', 'Cited By Count', 'Last Known University',
+           'Degree and Institution', 'Email', 'LinkedIn']
+# Number of ORCID API requests we allow ourselves, shared by every extract_and_save call in the process
 # Total allowed = 5000 daily, 5 per second API calls for base tier API users
-ORCID_REQUEST_COUNT = 0
+ORCID_DAILY_LIMIT = 5000
+# ORCID API base URL, requests are made relative to it
+ORCID_BASE_URL = "https://pub.orcid.org/v3.0/"
+# httpx only speaks HTTP/2 with the h2 package installed (pip install httpx[http2]), otherwise we stick to HTTP/1.1
+ORCID_HTTP2 = importlib.util.find_spec('h2') is not None
+# ORCID responses are cached on disk so re-runs (e.g. a new subject hitting the same researchers) don't spend API calls
+ORCID_CACHE_DIR = './orcid_cache'
+# Successful lookups are kept for 30 days, locked/missing records are retried after a day
+ORCID_CACHE_EXPIRE = 30 * 86400
+ORCID_NEGATIVE_CACHE_EXPIRE = 86400
+
+
+# Schema for the parts of an OpenAlex author record we use. msgspec decodes straight into these,
+# skipping every other field in the record without building Python objects for it
+# Any of these fields can come through as null, those entries are just skipped rather than rejecting the researcher
+class Concept(msgspec.Struct):
+    display_name: str | None = None
+    level: int | None = None
+    score: float | None = None
+
+
+class YearCount(msgspec.Struct):
+    year: int | None = None
+    works_count: int | None = None
+
+
+class Institution(msgspec.Struct):
+    display_name: str | None = None
+
+
+class SummaryStats(msgspec.Struct):
+    h_index: int | None = None
+
+
+class AuthorRecord(msgspec.Struct):
+    display_name: str | None = None
+    orcid: str | None = None
+    cited_by_count: int | None = 0
+    # The concept and publication year lists are kept as raw JSON bytes and only decoded for researchers
+    # that get past the cheap filters, since most are rejected on cited by count alone
+    x_concepts: msgspec.Raw = msgspec.Raw(b'[]')
+    counts_by_year: msgspec.Raw = msgspec.Raw(b'[]')
+    last_known_institution: Institution | None = None
+    summary_stats: SummaryStats | None = None
+
+
+# Built once and reused for every line of the snapshot
+AUTHOR_DECODER = msgspec.json.Decoder(AuthorRecord)
+CONCEPTS_DECODER = msgspec.json.Decoder(list[Concept] | None)
+COUNTS_BY_YEAR_DECODER = msgspec.json.Decoder(list[YearCount] | None)
 
 
 def find_json_files(directory):
-    # Use glob to locate the paths of all the .json files in the OpenAlex snapshot I have on my D: drive
-    return glob.glob(os.path.join(directory, '**', '*.json'), recursive=True)
+    # Walk the OpenAlex snapshot I have on my D: drive and yield the paths of all the .json files
+    # OpenAlex distributes the snapshot as gzipped JSON Lines (.gz), which we can read without decompressing to disk first
+    # os.scandir hands back the file type with each entry, so unlike a recursive glob there's no extra stat or pattern matching
+    for entry in os.scandir(directory):
+        if entry.is_dir(follow_symlinks=False):
+            yield from find_json_files(entry.path)
+        elif entry.name.endswith(('.json', '.gz')):
+            yield entry.path
+
+
+# Shared stand-in for missing keys so safe_get doesn't allocate a new {} for every step down the path
+_MISSING = {}
 
 
 def safe_get(d, *keys, default=None):
     # Helper function to safely get a value from a nested dictionary
     for key in keys:
-        if isinstance(d, dict):
-            d = d.get(key, {})
-        else:
+        if type(d) is not dict:
             return default
+        d = d.get(key, _MISSING)
     return d or default
 
 
+def _get_date_value(date_data, part, default):
+    # Specialized safe_get(date_data, part, 'value') for the ORCID start/end dates, read several times per degree
+    if type(date_data) is not dict:
+        return default
+    date_part = date_data.get(part)
+    if type(date_part) is not dict:
+        return default
+    return date_part.get('value') or default
+
+
 def is_leap_year(year):
     # Helper function to check if the year is a leap year
     return (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)
@@ -37,17 +116,17 @@ def is_leap_year(year):
 
 def safe_datetime(year, month, day):
     # Helper function to safely create a datetime object
-    try:
-        return datetime(year, month, day)
-    except ValueError:
+    # Check the day against the length of the month up front instead of catching datetime's ValueError
+    if month == 2:
+        last_day = 29 if is_leap_year(year) else 28
+    elif month in (4, 6, 9, 11):  # Months with 30 days
+        last_day = 30
+    else:  # Months with 31 days
+        last_day = 31
+    if not 1 <= day <= last_day:
         # Adjust day to the last day of the month
-        if month == 2:
-            day = 29 if is_leap_year(year) else 28
-        elif month in [4, 6, 9, 11]:  # Months with 30 days
-            day = 30
-        else:  # Months with 31 days
-            day = 31
-        return datetime(year, month, day)
+        day = last_day
+    return datetime(year, month, day)
 
 
 def safe_get_list(d, *keys):
@@ -58,78 +137,120 @@ def safe_get_list(d, *keys):
     return None
 
 
-def extract_orcid_info(orcid):
-    global ORCID_REQUEST_COUNT
-    # ORCID API has a 5000 per day request limit for non-API, base tier users
-    if ORCID_REQUEST_COUNT >= 5000:
-        return None, None, None
-
+def parse_orcid_record(data):
+    # Extract email, degree status, and LinkedIn URL from an ORCID record
+    email = safe_get_list(data, 'person', 'emails', 'email', 'email')
+    educations_group = data.get(
+        'activities-summary', {}).get('educations', {}).get('affiliation-group', [])
+
+    # Only need to grab the current date once for every degree we compare against
+    current_date = datetime.now()
+    degree_statuses = []
+    for edu_group in educations_group:
+        # For a given researcher, they may have multiple degrees from multiple institutions
+        summaries = edu_group.get('summaries', [])
+        for summary in summaries:
+            # For a given degree, there may be multiple summaries (e.g. one for each institution)
+            education = summary.get('education-summary', {})
+            degree = safe_get(education, 'role-title')
+            institution = safe_get(education, 'organization', 'name')
+            end_date_data = safe_get(education, 'end-date')
+            end_date = safe_datetime(int(_get_date_value(end_date_data, 'year', "1900")),
+                                     int(_get_date_value(end_date_data, 'month', "1")),
+                                     int(_get_date_value(end_date_data, 'day', "1")))
+
+            start_date_data = safe_get(education, 'start-date')
+            start_year = _get_date_value(start_date_data, 'year', "")
+
+            end_year = _get_date_value(end_date_data, 'year', "")
+            # We can parse the degrees in a natural language statement based on the start and end dates
+            if not end_date_data or end_date > current_date:
+                degree_status = f"Currently pursuing {degree} at {institution} (Started {start_year})" if degree and institution else None
+            else:
+                degree_status = f"Graduated with {degree} from {institution} in {end_year}" if degree and institution else None
+
+            if degree_status:
+                # If we sucessfully parsed the degree status, append it to the list
+                degree_statuses.append(degree_status)
+    # Combine the degree statuses into a single string
+    combined_degree_status = '; '.join(degree_statuses)
+    # Extract LinkedIn URL, which occasionally researchers store on their ORCID
+    researcher_urls = safe_get(
+        data, 'person', 'researcher-urls', 'researcher-url') or []
+
+    linkedin_url = None
+    # You can link a number of URL's on ORCID so we just need to find the LinkedIn one
+    for r_url in researcher_urls:
+        if r_url.get('url-name') == 'LinkedIn':
+            linkedin_url = r_url.get('url', {}).get('value')
+            break
+
+    return email, combined_degree_status, linkedin_url
+
+
+class OrcidBudget:
+    # Keeps track of the ORCID API requests made, so the many concurrent lookups can't go over the daily limit together
+    # Backed by a semaphore that's never released, each request permanently takes one slot out of the budget
+    def __init__(self, cap):
+        self._sem = asyncio.Semaphore(cap)
+        self.used = 0
+
+    async def try_acquire(self):
+        # Never waits: once the budget is spent we just skip the request rather than queueing it.
+        # acquire() only suspends when the semaphore is locked, and we've just checked it isn't, so taking the slot
+        # can't yield to another lookup. Since it never waits, it also never ties the semaphore to one event loop
+        if self._sem.locked():
+            return False
+        await self._sem.acquire()
+        self.used += 1
+        return True
+
+
+# One budget for the whole process, so calling extract_and_save several times can't go over the daily quota
+ORCID_BUDGET = OrcidBudget(ORCID_DAILY_LIMIT)
+
+
+async def extract_orcid_info_async(client, orcid, limiter, cache, budget):
     # Clean up the ORCID ID, which OpenAlex gives as full URL (https://orcid.org/0000-0002-1825-0097)
     orcid_cleaned = orcid.replace(
         "https://orcid.org/", "")  # remove the URL prefix
-    base_url = "https://pub.orcid.org/v3.0/"  # ORCID API base URL
-    # Format the ORCID to match the API URL expected by ORCID
-    url = base_url + orcid_cleaned + "/record"
-    headers = {"Accept": "application/json"}
-    response = requests.get(url, headers=headers)
+    # Researchers we've already looked up in a previous run don't cost us an API call
+    hit = cache.get(orcid_cleaned)
+    if hit is not None:
+        return tuple(orjson.loads(hit))
+
+    # ORCID API has a 5000 per day request limit for non-API, base tier users
+    if not await budget.try_acquire():
+        return None, None, None
 
-    ORCID_REQUEST_COUNT += 1  # Increment the tally of ORCID API calls
+    # The limiter is shared by every request so we stay under the 5 per second API limit,
+    # while still letting the slow responses overlap with each other
+    async with limiter:
+        try:
+            # Format the ORCID to match the API URL expected by ORCID (relative to the client's base URL)
+            response = await client.get(f"{orcid_cleaned}/record")
+        except httpx.HTTPError as e:
+            # Don't let one dropped connection take down the rest of the batch
+            print(f"Failed to fetch details for ORCID: {orcid}. Error: {str(e)}")
+            return None, None, None
 
     if response.status_code == 200:  # This is the code for a successful request
-        # Extract email, degree status, and LinkedIn URL from the response
-        data = response.json()
-        email = safe_get_list(data, 'person', 'emails', 'email', 'email')
-        educations_group = data.get(
-            'activities-summary', {}).get('educations', {}).get('affiliation-group', [])
-
-        degree_statuses = []
-        for edu_group in educations_group:
-            # For a given researcher, they may have multiple degrees from multiple institutions
-            summaries = edu_group.get('summaries', [])
-            for summary in summaries:
-                # For a given degree, there may be multiple summaries (e.g. one for each institution)
-                education = summary.get('education-summary', {})
-                degree = safe_get(education, 'role-title')
-                institution = safe_get(education, 'organization', 'name')
-                end_date_data = safe_get(education, 'end-date')
-                end_date = safe_datetime(int(safe_get(end_date_data, 'year', 'value', default="1900")),
-                                         int(safe_get(end_date_data,
-                                             'month', 'value', default="1")),
-                                         int(safe_get(end_date_data, 'day', 'value', default="1")))
-
-                current_date = datetime.now()
-
-                start_date_data = safe_get(education, 'start-date')
-                start_year = safe_get(
-                    start_date_data, 'year', 'value', default="")
-
-                end_year = safe_get(end_date_data, 'year', 'value', default="")
-                # We can parse the degrees in a natural language statement based on the start and end dates
-                if not end_date_data or end_date > current_date:
-                    degree_status = f"Currently pursuing {degree} at {institution} (Started {start_year})" if degree and institution else None
-                else:
-                    degree_status = f"Graduated with {degree} from {institution} in {end_year}" if degree and institution else None
-
-                if degree_status:
-                    # If we sucessfully parsed the degree status, append it to the list
-                    degree_statuses.append(degree_status)
-        # Combine the degree statuses into a single string
-        combined_degree_status = '; '.join(degree_statuses)
-        # Extract LinkedIn URL, which occasionally researchers store on their ORCID
-        researcher_urls = safe_get(
-            data, 'person', 'researcher-urls', 'researcher-url') or []
-
-        linkedin_url = None
-        # You can link a number of URL's on ORCID so we just need to find the LinkedIn one
-        for r_url in researcher_urls:
-            if r_url.get('url-name') == 'LinkedIn':
-                linkedin_url = r_url.get('url', {}).get('value')
-                break
-
-        return email, combined_degree_status, linkedin_url
+        try:
+            orcid_info = parse_orcid_record(response.json())
+        except (ValueError, AttributeError, TypeError) as e:
+            # A malformed record (e.g. an HTML error page) shouldn't take down the rest of the batch, don't cache it either
+            print(f"Failed to parse ORCID record {orcid}. Error: {str(e)}")
+            return None, None, None
+        cache.set(orcid_cleaned, orjson.dumps(orcid_info), expire=ORCID_CACHE_EXPIRE)
+        return orcid_info
     # Strange error code I've ran into a few times for a select group of ORCID's (not based on API tiers)
     elif response.status_code == 409:
         print(f"ORCID record {orcid} is locked and cannot be accessed.")
+        cache.set(orcid_cleaned, orjson.dumps((None, None, None)), expire=ORCID_NEGATIVE_CACHE_EXPIRE)
+        return None, None, None
+    elif response.status_code == 404:
+        print(f"ORCID record {orcid} was not found.")
+        cache.set(orcid_cleaned, orjson.dumps((None, None, None)), expire=ORCID_NEGATIVE_CACHE_EXPIRE)
         return None, None, None
     else:  # Just catch all other errors
         print(
@@ -138,153 +259,191 @@ def extract_orcid_info(orcid):
         return None, None, None
 
 
-def extract_info(input_file, relevant_subject):
-    # Call global ORCID request count (keeps track of total requests to respect API limits)
-    global ORCID_REQUEST_COUNT
-    # Initialize lists to store data
-    display_names = []
-    orcids = []
-    x_concepts_display_names = []
-    h_indices = []
-    cited_by_counts_list = []
-    last_known_universities = []
-    emails = []
-    degrees_status_list = []
-    linkedins = []
+async def fetch_all(orcids, budget):
+    # Ping the ORCID API for every researcher's email, degree status, and LinkedIn URL
+    # Returns a dict of ORCID to (email, degree status, LinkedIn URL)
+    orcids = list(orcids)
+    limiter = AsyncLimiter(5, 1)
+    # One pooled HTTP/2 client for the whole batch, so we only pay for the TCP + TLS handshake once per connection
+    client = httpx.AsyncClient(http2=ORCID_HTTP2, base_url=ORCID_BASE_URL, headers={"Accept": "application/json"},
+                               timeout=10.0, limits=httpx.Limits(max_connections=10))
+    with diskcache.Cache(ORCID_CACHE_DIR) as cache:
+        async with client:
+            orcid_results = await asyncio.gather(*(extract_orcid_info_async(client, orcid, limiter, cache, budget) for orcid in orcids))
+    return dict(zip(orcids, orcid_results))
+
+
+def iter_lines(input_file):
+    # Yield each line of a snapshot file as bytes, ready to hand straight to the decoder (no decode or strip needed)
+    # Gzipped files are decompressed as they're streamed rather than unpacked to disk beforehand
+    if input_file.endswith('.gz'):
+        with gzip.open(input_file, 'rb') as infile:
+            yield from infile
+        return
+    # Plain files are memory mapped so we split lines straight out of the OS page cache, skipping Python's buffered IO
+    with open(input_file, 'rb') as infile:
+        # mmap can't map an empty file
+        if os.fstat(infile.fileno()).st_size == 0:
+            return
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            find = mm.find
+            start = 0
+            while True:
+                end = find(b'\n', start)
+                if end < 0:
+                    break
+                yield mm[start:end]
+                start = end + 1
+            # Last line may not end in a newline
+            if start < len(mm):
+                yield mm[start:]
+
+
+def scan_file(input_file, subjects):
+    # Scan one .json file of the snapshot for researchers passing our filters (no ORCID calls happen here)
+    # Every subject is checked in this one pass over the file, so each file is only read and parsed once
+    # Each researcher passing the filters becomes one row, in the same order as COLUMNS,
+    # added to the bucket of every subject they matched
+    buckets = {subject: [] for subject in subjects}
     # Depth of OpenAlex tags we want to filter above (less broad topics)
     LEVEL_THRESHOLD = 1
-    # Open the JSON file
-    with open(input_file, 'r') as infile:
-        for line in infile:
-            try:
-                entry = json.loads(line.strip())
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON in file {input_file}")
+    # Number of top matching OpenAlex tags we keep per researcher, past this they're just noise in the spreadsheet
+    MAX_CONCEPTS = 20
+    # Prep for the recent publication filter, which is the same for every researcher in the file
+    current_year = datetime.now().year
+    # Must have published within the last 5 years, a frozenset makes each year lookup O(1)
+    recent_years = frozenset(range(current_year - 4, current_year + 1))
+    # msgspec decodes the raw bytes of each line directly
+    for line in iter_lines(input_file):
+        try:
+            entry = AUTHOR_DECODER.decode(line)
+            # Filter criteria, checked cheapest and most selective first so a researcher is dropped as early as possible
+            # 1. Cited By Count between 5 and 1000 rejects the vast majority of researchers, and is just an integer compare
+            if not (5 < (entry.cited_by_count or 0) < 1000):
+                continue
+            # 2. Must have an ORCID
+            if not entry.orcid:
                 continue
-            # Extract data from JSON
-            display_name = entry['display_name']
-            orcid = entry.get('orcid', None)
-            cited_by_count = entry.get('cited_by_count', None)
-            concepts = entry.get('x_concepts', [])
-            counts_by_year = entry.get('counts_by_year', [])
-
-            # Filter critieria 1
-            # Must have a valid Full name, ORCID, Cited By Count between 5 and 1000, and expertise in relevant subject
+            # 3. Must have a valid Full name
+            if not entry.display_name:
+                continue
+            # 4. Must have expertise in at least one of the relevant subjects (subjects is a frozenset)
             # [Idea]: This is a great spot to build a UI around for Journals to find applicable peer reviewers
-            if not (display_name and orcid and (5 < cited_by_count < 1000)
-                    and relevant_subject in [concept['display_name'] for concept in concepts]):
+            concepts = CONCEPTS_DECODER.decode(entry.x_concepts) or []
+            matched_subjects = subjects.intersection(concept.display_name for concept in concepts)
+            if not matched_subjects:
                 continue
-            # Prep for Filter 2
-            current_year = datetime.now().year
-            # Must have published within the last 5 years
-            recent_years = [current_year - i for i in range(5)]
-            # Check that the user has a publication within the last 5 years (recent_years array)
-            recent_publication = any(
-                year_count['year'] in recent_years and year_count['works_count'] >= 1 for year_count in counts_by_year)
-            # Filter critieria 2
-            # Must have published within the last 5 years
-            if not recent_publication:
+            # 5. Must have published within the last 5 years (recent_years set)
+            counts_by_year = COUNTS_BY_YEAR_DECODER.decode(entry.counts_by_year) or []
+            if not any(year_count.year in recent_years and (year_count.works_count or 0) >= 1
+                       for year_count in counts_by_year):
                 continue
-            # Extract last known university safely
-            # If last_known_institution key is missing, it will be 'None'
-            # If last_known_institution doesn't have a display_name  it'll be 'None' still
-            # If both keys exist it will have the value: entry['last_known_institution']['display_name']
-            last_known_institution = entry.get(
-                'last_known_institution', {})
-            last_known_university = last_known_institution.get(
-                'display_name', None) if last_known_institution else None
-            # Extract OpenAlex tags above the concept level threshold and store them
-            filtered_concepts = [
-                concept for concept in concepts if concept['level'] >= LEVEL_THRESHOLD]
-            # Sort them by their % match with the researcher
-            sorted_concepts = sorted(
-                filtered_concepts, key=lambda x: x['score'], reverse=True)
-            # Make sure to only grab the unique concept names
-            unique_concept_names = [concept['display_name']
-                                    for concept in sorted_concepts]
-            concepts_str = ', '.join(unique_concept_names)
-            # Extract H-Index from OpenAlex
-            h_index = entry.get('summary_stats', {}).get('h_index', None)
-            # Append all the data to their respective lists
-            display_names.append(display_name)
-            orcids.append(orcid)
-            x_concepts_display_names.append(concepts_str)
-            h_indices.append(h_index)
-            cited_by_counts_list.append(cited_by_count)
-            last_known_universities.append(last_known_university)
-            # Ping the ORCID API for the researcher's email, degree status, and LinkedIn URL
-            if orcid:
-                email, degree_status, linkedin = extract_orcid_info(orcid)
-                # Pause for 0.2 seconds to respect the API RPS limit
-                time.sleep(0.2)
-            else:
-                email, degree_status, linkedin = None, None, None
-            # Append remaining data to their respective lists
-            emails.append(email)
-            degrees_status_list.append(degree_status)
-            linkedins.append(linkedin)
-    # Create a new dataframe with all the data once we've read every line of the .json files
-    df_new = pd.DataFrame({
-        'Display Name': display_names,
-        'ORCID': orcids,
-        'Concepts': x_concepts_display_names,
-        'H-Index': h_indices,
-        'Cited By Count': cited_by_counts_list,
-        'Last Known University': last_known_universities,
-        'Degree and Institution': degrees_status_list,
-        'Email': emails,
-        'LinkedIn': linkedins
-    })
-
-    return df_new
+        except msgspec.ValidationError as e:
+            # Valid JSON, but a field doesn't have the type our schema expects
+            print(f"Unexpected record layout in file {input_file}: {str(e)}")
+            continue
+        except msgspec.DecodeError:
+            print(f"Error decoding JSON in file {input_file}")
+            continue
+        # Extract last known university safely, it's 'None' if the institution or its display_name is missing
+        last_known_institution = entry.last_known_institution
+        last_known_university = last_known_institution.display_name if last_known_institution else None
+        # Extract OpenAlex tags above the concept level threshold and store them
+        filtered_concepts = [
+            concept for concept in concepts
+            if concept.display_name and concept.score is not None
+            and concept.level is not None and concept.level >= LEVEL_THRESHOLD]
+        # Keep the best ones by their % match with the researcher, heapq avoids sorting the whole list
+        sorted_concepts = heapq.nlargest(
+            MAX_CONCEPTS, filtered_concepts, key=attrgetter('score'))
+        concepts_str = ', '.join(concept.display_name for concept in sorted_concepts)
+        # Extract H-Index from OpenAlex
+        h_index = entry.summary_stats.h_index if entry.summary_stats else None
+        # Degree, Email, and LinkedIn are placeholders filled in by extract_and_save once every file has been scanned
+        row = (entry.display_name, entry.orcid, concepts_str, h_index, entry.cited_by_count, last_known_university,
+               None, None, None)
+        for subject in matched_subjects:
+            buckets[subject].append(row)
+
+    return buckets
+
+
+def save_to_excel(rows, relevant_subject):
+    # Stream the rows straight to .xlsx, which is the local format I wanted
+    # constant_memory mode flushes each row to disk as it's written instead of holding the whole sheet in memory
+    # Everything is written as plain strings: turning ORCID/LinkedIn URLs into hyperlinks would hit Excel's
+    # 65,530 links per sheet limit (xlsxwriter blanks the rest of the row past it), and names starting with '=' aren't formulas
+    rows = iter(rows)
+    # May need multiple files if there are too many rows, as by MAX_EXCEL_ROWS
+    for file_counter in itertools.count():
+        # Peek at the next row so we don't create an empty file once the rows run out
+        first_row = next(rows, None)
+        if first_row is None:
+            break
+        # make sure spaces don't mess up the filename
+        filename = f"./{relevant_subject.replace(' ', '_')}_{file_counter}.xlsx"
+        with xlsxwriter.Workbook(filename, {'constant_memory': True, 'strings_to_urls': False,
+                                            'strings_to_formulas': False}) as workbook:
+            worksheet = workbook.add_worksheet()
+            worksheet.write_row(0, 0, COLUMNS)
+            # Each file takes the next MAX_EXCEL_ROWS rows off the stream, row 0 is the header
+            file_rows = itertools.chain((first_row,), itertools.islice(rows, MAX_EXCEL_ROWS - 1))
+            for sheet_row, row in enumerate(file_rows, start=1):
+                worksheet.write_row(sheet_row, 0, row)
+
+
+def fill_orcid_columns(rows, orcid_info):
+    # Swap the Degree, Email, and LinkedIn placeholders on each row for the researcher's ORCID details
+    for row in rows:
+        email, degree_status, linkedin = orcid_info[row[1]]
+        yield row[:-3] + (degree_status, email, linkedin)
 
 
 # 'D:\\openalex-snapshot\\data\\authors'
 # 'C:\\Users\\tydio\\Documents\\OpenAlex\\TestData'):
 
 # Main Driving function
-def extract_and_save(relevant_subject, directory='D:\\openalex-snapshot\\data\\authors'):
+def extract_and_save(subjects, directory='D:\\openalex-snapshot\\data\\authors'):
+    # Takes a list of concept tags, and still accepts a single one as before
+    if isinstance(subjects, str):
+        subjects = [subjects]
+    # Flag this up front rather than after a long scan
+    if not ORCID_HTTP2:
+        print("h2 isn't installed, ORCID requests will use HTTP/1.1 (pip install httpx[http2] for HTTP/2).")
     # OpenAlex data snapshot is saved on my D: drive so I locate all the .json files in the snapshot first
-    all_json_files = find_json_files(directory)
+    all_json_files = list(find_json_files(directory))
     print(f"Found {len(all_json_files)} JSON files.")
-    dfs = []
-    # Then submit each .json file to the extract_info function to extract the relevant data
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        futures = [executor.submit(extract_info, file_path, relevant_subject)
+    rows_by_subject = {subject: [] for subject in subjects}
+    # Then submit each .json file to the scan_file function to extract the relevant data for every subject at once
+    # Scanning is CPU bound on JSON parsing, so use processes rather than threads fighting over the GIL
+    # The default pool size is one worker per core, capped at the 61 workers Windows allows
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        futures = [executor.submit(scan_file, file_path, frozenset(subjects))
                    for file_path in all_json_files]
         for future in concurrent.futures.as_completed(futures):
-            # Try to append the data to the list of dataframes
+            # Try to add the file's researchers to each subject's list of rows
             try:
-                dfs.append(future.result())
+                for subject, rows in future.result().items():
+                    rows_by_subject[subject].extend(rows)
             except Exception as e:
                 print(f"Exception occurred: {str(e)}")
                 traceback.print_exc()
-    if not dfs:  # Check if dfs is empty
-        print("No data to save. Exiting.")
-        return
-    # Concatenate all the dataframes into one
-    final_df = pd.concat(dfs, ignore_index=True)
-    # May need multiple files if the dataframe is too large, as by MAX_EXCEL_ROWS
-    file_counter = 0
-    # Do the saving to .xlsx, which is the local format I wanted
-    while not final_df.empty:
-        # Trim the dataframe to the max number of rows allowed
-        current_df = final_df.head(MAX_EXCEL_ROWS)
-        final_df = final_df.tail(final_df.shape[0] - MAX_EXCEL_ROWS)
-        # Save the dataframe to an excel file
-        # make sure spaces don't mess it up
-        filename = f"./{relevant_subject.replace(' ', '_')}_{file_counter}.xlsx"
-        current_df.to_excel(filename, index=False, engine='openpyxl')
-
-        # Increment the file counter because if any data remains we'll need to go back through to the next excel file save
-        file_counter += 1
-    print(f"Total ORCID requests made: {ORCID_REQUEST_COUNT}")
+    # Now that the JSON scanning is done, fetch the ORCID details for every researcher concurrently
+    # A researcher can show up under several subjects (or several times in the snapshot), so only look each ORCID up once
+    unique_orcids = {orcid for rows in rows_by_subject.values() for _, orcid, *_ in rows}
+    orcid_info = asyncio.run(fetch_all(unique_orcids, ORCID_BUDGET))
+    for subject, rows in rows_by_subject.items():
+        if not rows:  # Check if rows is empty
+            print(f"No data to save for {subject}.")
+            continue
+        # Fill the ORCID placeholders on each row as they're written out, one set of .xlsx files per subject
+        save_to_excel(fill_orcid_columns(rows, orcid_info), subject)
+    print(f"Total ORCID requests made: {ORCID_BUDGET.used}")
     print()
 
 
 # Usage
-# As many calls here as we want for concept tags
-extract_and_save("Catalysis")
-extract_and_save("Biomarkers")
-extract_and_save("Ebola virus")
-extract_and_save("Virology")
+# As many concept tags here as we want, the snapshot is only scanned once for all of them
+# The __main__ guard stops the worker processes from re-running this call when they import this script
+if __name__ == '__main__':
+    extract_and_save(["Catalysis", "Biomarkers", "Ebola virus", "Virology"])